@@ -13,6 +13,7 @@ class AdminCog(commands.Cog):
         self.a = b.active_channels
         self.s = b.save_enabled_channels
         self.m = b.MEMORY_DIR
+        self.ml = b.memory_lock
         self.r = b.safe_send_response
 
     @app_commands.command(name="arise", description="Activate Yu Zhong in this channel.")
@@ -53,11 +54,13 @@ class AdminCog(commands.Cog):
 
         for f in os.listdir(self.m):
             if f.startswith(f"user_{g}_") and f.endswith(".json"):
+                fp = os.path.join(self.m, f)
                 try:
-                    os.remove(os.path.join(self.m, f))
+                    with self.ml(fp):
+                        os.remove(fp)
                     rem = True
                 except OSError as e:
-                    l.error(f"Failed to remove memory file {f}: {e}")
+                    l.error("Failed to remove memory file %s: %s", f, e)
 
         if rem:
             await self.r(i, "Yu Zhong's memory has been purged for this server.", ephemeral=True)
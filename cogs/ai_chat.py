@@ -5,6 +5,8 @@ import os
 import json
 import logging
 import asyncio
+import time
+from shapes_breaker import CircuitOpenError
 
 l = logging.getLogger('YuZhongBot')
 
@@ -13,9 +15,12 @@ class AIChatCog(commands.Cog):
         self.b = b
         self.p = b.personality
         self.r = b.safe_send_response
+        self.cb = b.shapes_breaker
         self.dt = b.DEFAULT_TONE
         self.mt = b.MAX_MEMORY_PER_USER_TOKENS
         self.m = b.MEMORY_DIR
+        self.ml = b.memory_lock
+        self.cx = b.SEARCH_CONTEXT_BUDGET
 
         # Lazy init placeholders
         self.sc = None
@@ -40,12 +45,15 @@ class AIChatCog(commands.Cog):
             self.sc = OpenAI(
                 base_url="https://api.shapes.inc/v1/",
                 api_key=a,
-                timeout=60.0
+                # Match the breaker's deadline so abandoned calls free their pool worker
+                timeout=self.cb.ct,
+                max_retries=0
             )
 
-            res = await asyncio.to_thread(self.sc.models.list)
+            res = await self.cb.call(self.sc.models.list)
             am = [m.id for m in res.data]
-            l.info(f"Shapes.inc available models: {am}")
+            l.info("Shapes.inc listed %s model(s).", len(am))
+            l.debug("Shapes.inc available models: %s", am)
 
             mm = next(
                 (m for m in am if u in m or m == u),
@@ -54,13 +62,18 @@ class AIChatCog(commands.Cog):
 
             if mm:
                 self.sm = mm
-                l.info(f"Shapes.inc model resolved: {mm}")
+                l.info("Shapes.inc model resolved: %s", mm)
             else:
-                l.critical(f"Shapes.inc model '{u}' not found. AI features disabled.")
+                l.critical("Shapes.inc model '%s' not found. AI features disabled.", u)
                 self.sc = None
+        except CircuitOpenError:
+            l.warning("Shapes.inc circuit open; client init will be retried.")
+            self.sc = None
+            self.si = False
         except Exception as e:
-            l.critical(f"Failed to initialize Shapes.inc client or resolve model: {e}")
+            l.critical("Failed to initialize Shapes.inc client or resolve model: %s", e)
             self.sc = None
+            self.si = False
 
     def get_user_memory_filepath(self, g, u):
         return os.path.join(self.m, f"user_{g}_{u}.json")
@@ -69,7 +82,7 @@ class AIChatCog(commands.Cog):
         fp = self.get_user_memory_filepath(g, u)
         if os.path.exists(fp):
             try:
-                with open(fp, "r", encoding="utf-8") as f:
+                with self.ml(fp), open(fp, "r", encoding="utf-8") as f:
                     mem = json.load(f)
 
                 if "tone" not in mem:
@@ -81,38 +94,39 @@ class AIChatCog(commands.Cog):
 
                 return mem
             except json.JSONDecodeError as e:
-                l.error(f"Error decoding memory for user {u} in guild {g}: {e}")
+                l.error("Error decoding memory for user %s in guild %s: %s", u, g, e)
             except Exception as e:
-                l.error(f"Unexpected error loading memory for user {u} in guild {g}: {e}")
+                l.error("Unexpected error loading memory for user %s in guild %s: %s", u, g, e)
 
         return {"log": [], "tone": self.dt.copy()}
 
     def save_user_memory(self, g, u, md):
         fp = self.get_user_memory_filepath(g, u)
         try:
-            with open(fp, "w", encoding="utf-8") as f:
+            with self.ml(fp), open(fp, "w", encoding="utf-8") as f:
                 json.dump(md, f, indent=4)
         except IOError as e:
-            l.error(f"Failed to save user memory for {u} in guild {g}: {e}")
+            l.error("Failed to save user memory for %s in guild %s: %s", u, g, e)
 
     def update_user_memory(self, g, u, ui, rep, tc):
-        mem = self.load_user_memory(g, u)
-
-        mem["log"].append({"role": "user", "content": ui})
-        mem["log"].append({"role": "assistant", "content": rep})
-        mem["tone"][tc] += 1
+        with self.ml(self.get_user_memory_filepath(g, u)):
+            mem = self.load_user_memory(g, u)
 
-        c = sum(
-            len(m["content"].split()) for m in mem["log"] if isinstance(m["content"], str)
-        )
+            mem["log"].append({"role": "user", "content": ui})
+            mem["log"].append({"role": "assistant", "content": rep})
+            mem["tone"][tc] += 1
 
-        while c > self.mt and len(mem["log"]) > 2:
-            mem["log"] = mem["log"][2:]
             c = sum(
                 len(m["content"].split()) for m in mem["log"] if isinstance(m["content"], str)
             )
 
-        self.save_user_memory(g, u, mem)
+            while c > self.mt and len(mem["log"]) > 2:
+                mem["log"] = mem["log"][2:]
+                c = sum(
+                    len(m["content"].split()) for m in mem["log"] if isinstance(m["content"], str)
+                )
+
+            self.save_user_memory(g, u, mem)
 
     def determine_tone(self, t):
         tl = t.lower()
@@ -126,6 +140,55 @@ class AIChatCog(commands.Cog):
             return "negative"
         return "neutral"
 
+    async def gather_search_context(self, g, u):
+        """Load memory and patch notes concurrently under the context budget.
+
+        If fresh patch notes miss the budget or the refresh fails, the last
+        cached summary is used instead; the refresh keeps running in MLBBCog
+        so later searches hit the cache.
+        """
+        st = time.monotonic()
+        mt = asyncio.create_task(asyncio.to_thread(self.load_user_memory, g, u))
+
+        mc = self.b.get_cog("MLBBCog")
+        pt = asyncio.create_task(mc.get_latest_patch_notes()) if mc else None
+        if not mc:
+            l.warning("MLBBCog not loaded, cannot get patch notes for search.")
+
+        pn = ""
+        pr = False
+        ps = False
+        pe = False
+        if pt:
+            try:
+                pn = await asyncio.wait_for(pt, timeout=self.cx)
+                pr = True
+            except asyncio.TimeoutError:
+                l.info("Patch context not ready within %.1fs.", self.cx)
+            except Exception as e:
+                pe = True
+                l.warning("Failed to get patch notes for search: %s", e)
+
+            if not pr:
+                # Fall back to the expired summary while the refresh finishes
+                pn = mc.cached_patch_notes() or ""
+                ps = bool(pn)
+
+        md = await mt
+        el = round((time.monotonic() - st) * 1000)
+        l.info(
+            "Search context assembled in %sms (patch_ready=%s, patch_stale=%s, patch_error=%s).",
+            el, pr, ps, pe,
+            extra={
+                "metric": "search_context",
+                "elapsed_ms": el,
+                "patch_ready": pr,
+                "patch_stale": ps,
+                "patch_error": pe,
+            },
+        )
+        return md, pn
+
     @commands.Cog.listener()
     async def on_message(self, mes):
         if mes.author.bot or mes.author == self.b.user:
@@ -145,7 +208,7 @@ class AIChatCog(commands.Cog):
         if mes.attachments:
             await mes.channel.typing()
             await mes.reply("Hmph! Such trivial images hold no sway over my ancient power. My grasp extends beyond mere visual conjurations.")
-            l.info(f"Replied to message with attachment from {n} in {mes.channel.name}")
+            l.debug("Replied to message with attachment from %s in %s", n, mes.channel.name)
             return
 
         if not mes.content:
@@ -153,12 +216,12 @@ class AIChatCog(commands.Cog):
 
         await self.lazy_init_shapes_client()
         if not self.sc:
-            l.warning(f"Shapes.inc client not available for channel {c}.")
+            l.warning("Shapes.inc client not available for channel %s.", c)
             await mes.reply("My arcane powers are dormant... (AI service unavailable.)")
             return
 
         async with mes.channel.typing():
-            md = self.load_user_memory(g, u)
+            md = await asyncio.to_thread(self.load_user_memory, g, u)
 
             mes_list = [{"role": "system", "content": self.p}]
             pos, neg = md["tone"]["positive"], md["tone"]["negative"]
@@ -177,20 +240,25 @@ class AIChatCog(commands.Cog):
 
             rep = "My power wanes... I cannot respond at this moment."
             tc = "neutral"
+            fb = False
 
             try:
-                comp = await asyncio.to_thread(
+                comp = await self.cb.call(
                     self.sc.chat.completions.create,
                     model=self.sm,
                     messages=mes_list,
                     max_tokens=200,
                     temperature=0.8,
+                    hedge=True,
                 )
                 if comp and comp.choices and comp.choices[0].message:
                     rep = comp.choices[0].message.content.strip()
                     tc = self.determine_tone(mes.content)
+            except CircuitOpenError:
+                l.warning("Shapes.inc circuit open; fallback reply sent in channel %s.", c)
+                fb = True
             except Exception as e:
-                l.error(f"Error calling Shapes.inc API: {e}")
+                l.error("Error calling Shapes.inc API: %s", e)
                 if "rate limit" in str(e).lower():
                     rep = "Even a dragon's power is not infinite. My voice is temporarily restricted."
                 else:
@@ -200,7 +268,9 @@ class AIChatCog(commands.Cog):
                 rep = rep[:1897] + "..."
 
             await mes.reply(rep)
-            self.update_user_memory(g, u, ui, rep, tc)
+            # Keep canned outage replies out of the conversation history
+            if not fb:
+                await asyncio.to_thread(self.update_user_memory, g, u, ui, rep, tc)
 
     @app_commands.command(
         name="search",
@@ -215,20 +285,19 @@ class AIChatCog(commands.Cog):
 
         await i.response.defer()
 
+        g = str(i.guild_id) if i.guild else "DM"
+        u = str(i.user.id)
+
+        # Client init and prompt context run side by side
+        ct = asyncio.create_task(self.gather_search_context(g, u))
         await self.lazy_init_shapes_client()
         if not self.sc:
+            ct.cancel()
             await self.r(i, "My arcane powers are dormant... (AI service unavailable.)")
             return
 
         try:
-            g = str(i.guild_id) if i.guild else "DM"
-            u = str(i.user.id)
-            md = self.load_user_memory(g, u)
-
-            mc = self.b.get_cog("MLBBCog")
-            pn = await mc.get_latest_patch_notes() if mc else ""
-            if not mc:
-                l.warning("MLBBCog not loaded, cannot get patch notes for search.")
+            md, pn = await ct
 
             n = i.user.display_name
 
@@ -256,9 +325,10 @@ class AIChatCog(commands.Cog):
 
             rep = "My power wanes... I cannot fulfill this search at the moment."
             tc = "neutral"
+            fb = False
 
             try:
-                comp = await asyncio.to_thread(
+                comp = await self.cb.call(
                     self.sc.chat.completions.create,
                     model=self.sm,
                     messages=mes_list,
@@ -268,8 +338,11 @@ class AIChatCog(commands.Cog):
                 if comp and comp.choices and comp.choices[0].message:
                     rep = comp.choices[0].message.content.strip()
                     tc = self.determine_tone(q)
+            except CircuitOpenError:
+                l.warning("Shapes.inc circuit open; fallback reply sent for search.")
+                fb = True
             except Exception as e:
-                l.error(f"Error calling Shapes.inc API for search: {e}")
+                l.error("Error calling Shapes.inc API for search: %s", e)
                 if "rate limit" in str(e).lower():
                     rep = "Even a dragon's power is not infinite. My knowledge is temporarily restricted."
                 else:
@@ -279,10 +352,12 @@ class AIChatCog(commands.Cog):
                 rep = rep[:1897] + "..."
 
             await self.r(i, rep)
-            self.update_user_memory(g, u, fqc, rep, tc)
+            # Keep canned outage replies out of the conversation history
+            if not fb:
+                await asyncio.to_thread(self.update_user_memory, g, u, fqc, rep, tc)
 
         except Exception as e:
-            l.error(f"Unexpected error in search command: {e}")
+            l.error("Unexpected error in search command: %s", e)
             await self.r(i, "A ripple in the void has interrupted my search.")
 
 
@@ -0,0 +1,222 @@
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+import os
+import json
+import logging
+import asyncio
+import time
+
+l = logging.getLogger('YuZhongBot')
+
+class MemoryCog(commands.Cog):
+    def __init__(self, b):
+        self.b = b
+        self.r = b.safe_send_response
+        self.m = b.MEMORY_DIR
+        self.ml = b.memory_lock
+
+        # Retention policy
+        self.ttl = b.MEMORY_IDLE_TTL_DAYS * 86400
+        self.ca = b.MEMORY_COMPACT_AFTER_DAYS * 86400
+        self.ck = b.MEMORY_COMPACT_KEEP_MESSAGES
+        self.gq = b.MEMORY_GUILD_QUOTA_BYTES
+        self.tq = b.MEMORY_GLOBAL_QUOTA_BYTES
+
+        # Last usage report: {guild_id: {"files": n, "bytes": n}}
+        self.u = {}
+        # Files already compacted, keyed by path -> mtime
+        self.cd = {}
+        self.lk = asyncio.Lock()
+
+        # An interval of 0 disables the background job
+        self.ri = b.MEMORY_RETENTION_INTERVAL_MINUTES
+        if self.ri > 0:
+            self.retention_job.change_interval(minutes=self.ri)
+
+    async def cog_load(self):
+        if self.ri > 0:
+            self.retention_job.start()
+        else:
+            l.info("Memory retention job disabled.")
+
+    async def cog_unload(self):
+        self.retention_job.cancel()
+
+    def scan_memory_files(self):
+        e = []
+        if not os.path.isdir(self.m):
+            return e
+
+        with os.scandir(self.m) as it:
+            for d in it:
+                n = d.name
+                if not (n.startswith("user_") and n.endswith(".json")):
+                    continue
+                gu = n[5:-5].rsplit("_", 1)
+                if len(gu) != 2:
+                    continue
+                try:
+                    st = d.stat()
+                except OSError:
+                    continue
+                e.append({
+                    "path": d.path,
+                    "guild": gu[0],
+                    "size": st.st_size,
+                    "mtime": st.st_mtime,
+                    "atime": st.st_atime,
+                })
+        return e
+
+    def remove_memory_file(self, e, why):
+        try:
+            with self.ml(e["path"]):
+                # Skip files written since the scan; the user is no longer idle
+                if os.stat(e["path"]).st_mtime != e["mtime"]:
+                    return False
+                os.remove(e["path"])
+            self.cd.pop(e["path"], None)
+            l.info("Removed memory file %s (%s).", os.path.basename(e['path']), why)
+            return True
+        except FileNotFoundError:
+            return True
+        except OSError as ex:
+            l.error("Failed to remove memory file %s: %s", e['path'], ex)
+            return False
+
+    def compact_memory_file(self, e):
+        fp = e["path"]
+        if self.cd.get(fp) == e["mtime"]:
+            return
+
+        # Read and serialize without the lock; it is only held for the
+        # final mtime check and swap so chat saves never wait on JSON work.
+        try:
+            with open(fp, "r", encoding="utf-8") as f:
+                mem = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError) as ex:
+            l.warning("Skipping compaction of %s: %s", fp, ex)
+            return
+
+        lg = mem.get("log", [])
+        k = self.ck - (self.ck % 2)
+        if len(lg) > k:
+            mem["log"] = lg[-k:] if k else []
+
+        tmp = fp + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(mem, f, separators=(",", ":"))
+
+            with self.ml(fp):
+                # Bail out if the user spoke since the scan
+                if os.stat(fp).st_mtime != e["mtime"]:
+                    os.remove(tmp)
+                    return
+                os.replace(tmp, fp)
+                # Keep the original timestamps so compaction does not reset the idle clock
+                os.utime(fp, (e["atime"], e["mtime"]))
+
+            e["size"] = os.stat(fp).st_size
+            self.cd[fp] = e["mtime"]
+        except OSError as ex:
+            if not isinstance(ex, FileNotFoundError):
+                l.error("Failed to compact memory file %s: %s", fp, ex)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def apply_retention(self):
+        n = time.time()
+        es = self.scan_memory_files()
+        ke = []
+
+        # Idle TTL, then compaction of cold conversations
+        for e in es:
+            idle = n - e["mtime"]
+            if self.ttl and idle > self.ttl:
+                self.remove_memory_file(e, "idle TTL expired")
+                continue
+            if self.ca and idle > self.ca:
+                self.compact_memory_file(e)
+            ke.append(e)
+
+        # LRU order: coldest conversation first
+        ke.sort(key=lambda e: e["mtime"])
+
+        gt = {}
+        for e in ke:
+            gt[e["guild"]] = gt.get(e["guild"], 0) + e["size"]
+
+        # Per-guild quota
+        rem = []
+        for e in ke:
+            if self.gq and gt[e["guild"]] > self.gq:
+                if self.remove_memory_file(e, "guild quota exceeded"):
+                    gt[e["guild"]] -= e["size"]
+                    continue
+            rem.append(e)
+
+        # Global quota
+        t = sum(e["size"] for e in rem)
+        ke = []
+        for e in rem:
+            if self.tq and t > self.tq:
+                if self.remove_memory_file(e, "global quota exceeded"):
+                    t -= e["size"]
+                    continue
+            ke.append(e)
+
+        self.cd = {k: v for k, v in self.cd.items() if os.path.exists(k)}
+
+        u = {}
+        for e in ke:
+            s = u.setdefault(e["guild"], {"files": 0, "bytes": 0})
+            s["files"] += 1
+            s["bytes"] += e["size"]
+        return u
+
+    async def run_retention(self):
+        async with self.lk:
+            self.u = await asyncio.to_thread(self.apply_retention)
+
+        tb = sum(s["bytes"] for s in self.u.values())
+        tf = sum(s["files"] for s in self.u.values())
+        l.info("Memory retention pass done: %s file(s), %s bytes across %s guild(s).", tf, tb, len(self.u))
+        for g, s in self.u.items():
+            l.info("Memory usage for guild %s: %s file(s), %s bytes.", g, s['files'], s['bytes'])
+
+    @tasks.loop(minutes=60)
+    async def retention_job(self):
+        try:
+            await self.run_retention()
+        except Exception as e:
+            l.error("Memory retention job failed: %s", e)
+
+    @retention_job.before_loop
+    async def before_retention_job(self):
+        await self.b.wait_until_ready()
+
+    @app_commands.command(name="memory", description="Show Yu Zhong's memory usage for this server.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def memory(self, i: discord.Interaction):
+        if i.guild_id is None:
+            await self.r(i, "This command can only be used in a server.", True)
+            return
+
+        g = str(i.guild_id)
+        s = self.u.get(g, {"files": 0, "bytes": 0})
+        q = f" of {self.gq / 1048576:.1f} MB" if self.gq else ""
+        await self.r(
+            i,
+            f"I hold memories of {s['files']} mortal(s) in this server, "
+            f"weighing {s['bytes'] / 1048576:.2f} MB{q}.",
+            True
+        )
+
+async def setup(b):
+    await b.add_cog(MemoryCog(b))
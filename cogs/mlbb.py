@@ -6,6 +6,7 @@ import asyncio
 import time
 from bs4 import BeautifulSoup
 import cloudscraper
+from shapes_breaker import CircuitOpenError
 
 l = logging.getLogger('YuZhongBot')
 
@@ -16,6 +17,7 @@ class MLBBCog(commands.Cog):
         self.b = b
         self.p = b.personality
         self.r = b.safe_send_response
+        self.cb = b.shapes_breaker
 
         # Lazy init placeholders
         self.sc = None
@@ -25,6 +27,9 @@ class MLBBCog(commands.Cog):
         # Cloudscraper session
         self.cs = cloudscraper.create_scraper()
 
+        # In-flight patch notes refresh
+        self.pt = None
+
     async def lazy_init_shapes_client(self):
         if self.si:
             return
@@ -43,12 +48,15 @@ class MLBBCog(commands.Cog):
             self.sc = OpenAI(
                 base_url="https://api.shapes.inc/v1/",
                 api_key=a,
-                timeout=60.0
+                # Match the breaker's deadline so abandoned calls free their pool worker
+                timeout=self.cb.ct,
+                max_retries=0
             )
 
-            res = await asyncio.to_thread(self.sc.models.list)
+            res = await self.cb.call(self.sc.models.list)
             am = [m.id for m in res.data]
-            l.info(f"Shapes.inc available models: {am}")
+            l.info("Shapes.inc listed %s model(s).", len(am))
+            l.debug("Shapes.inc available models: %s", am)
 
             mm = next(
                 (m for m in am if u in m or m == u),
@@ -57,19 +65,36 @@ class MLBBCog(commands.Cog):
 
             if mm:
                 self.sm = mm
-                l.info(f"Shapes.inc model resolved: {mm}")
+                l.info("Shapes.inc model resolved: %s", mm)
             else:
-                l.critical(f"Shapes.inc model '{u}' not found. AI features disabled.")
+                l.critical("Shapes.inc model '%s' not found. AI features disabled.", u)
                 self.sc = None
+        except CircuitOpenError:
+            l.warning("Shapes.inc circuit open; client init will be retried.")
+            self.sc = None
+            self.si = False
         except Exception as e:
-            l.critical(f"Failed to initialize Shapes.inc client or resolve model: {e}")
+            l.critical("Failed to initialize Shapes.inc client or resolve model: %s", e)
             self.sc = None
+            self.si = False
+
+    def cached_patch_notes(self):
+        """Return the last patch notes summary, however old, or None."""
+        return pc["data"]
 
     async def get_latest_patch_notes(self):
+        if pc["data"] and (time.time() - pc["timestamp"]) < 3600:
+            return pc["data"]
+
+        # Share one in-flight refresh; shield it so a caller giving up on
+        # its deadline does not cancel the scrape for everyone else.
+        if self.pt is None or self.pt.done():
+            self.pt = asyncio.create_task(self.fetch_patch_notes())
+        return await asyncio.shield(self.pt)
+
+    async def fetch_patch_notes(self):
         global pc
         n = time.time()
-        if pc["data"] and (n - pc["timestamp"]) < 3600:
-            return pc["data"]
 
         await self.lazy_init_shapes_client()
 
@@ -129,7 +154,7 @@ class MLBBCog(commands.Cog):
                         break
 
             except Exception as e:
-                l.warning(f"Failed to fetch or parse from {u}: {e}")
+                l.warning("Failed to fetch or parse from %s: %s", u, e)
                 continue
 
         # If we have summary text and AI client ready, summarize with AI
@@ -145,7 +170,7 @@ class MLBBCog(commands.Cog):
                     {"role": "system", "content": self.p},
                     {"role": "user", "content": prompt}
                 ]
-                comp = await asyncio.to_thread(
+                comp = await self.cb.call(
                     self.sc.chat.completions.create,
                     model=self.sm,
                     messages=m,
@@ -157,8 +182,10 @@ class MLBBCog(commands.Cog):
                     pc["data"] = summary
                     pc["timestamp"] = n
                     return summary
+            except CircuitOpenError:
+                l.warning("Shapes.inc circuit open; using scraped text fallback.")
             except Exception as e:
-                l.warning(f"AI summarization failed: {e}. Using scraped text fallback.")
+                l.warning("AI summarization failed: %s. Using scraped text fallback.", e)
 
         if not s:
             s = "Unable to fetch current patch notes. The Land of Dawn's secrets remain hidden for now."
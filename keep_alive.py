@@ -13,7 +13,7 @@ def home():
 
 def run_flask_server():
     port = int(os.environ.get("PORT", 5000))
-    logger.info(f"Keep-alive web server starting on port {port}")
+    logger.info("Keep-alive web server starting on port %s", port)
     app.run(host='0.0.0.0', port=port, debug=False)
 
 def keep_alive():
@@ -0,0 +1,159 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+# Attributes every LogRecord carries; anything else came in through `extra=`
+_STD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra=` fields kept as keys."""
+
+    def format(self, record):
+        d = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for k, v in vars(record).items():
+            if k not in _STD:
+                d[k] = v
+        if record.exc_info:
+            d["exc"] = self.formatException(record.exc_info)
+        return json.dumps(d, default=str, ensure_ascii=False)
+
+
+class ErrorSampler(logging.Filter):
+    """Rate-limits repeated warnings and errors from the same call site.
+
+    Each call site may emit `burst` records per `window` seconds; the rest
+    are dropped and counted. flush() turns the drop counts of windows that
+    have ended into summary records, so they are reported even if the call
+    site goes quiet.
+    """
+
+    def __init__(self, window=60.0, burst=5):
+        super().__init__()
+        self.w = window
+        self.bu = burst
+        self.s = {}
+        self.lk = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+
+        k = (record.name, record.levelno, record.pathname, record.lineno)
+        n = time.monotonic()
+        with self.lk:
+            st = self.s.get(k)
+            if st is None or n - st[0] >= self.w:
+                dr = st[2] if st else 0
+                self.s[k] = [n, 1, 0, record.msg]
+                if dr:
+                    record.suppressed = dr
+                return True
+            if st[1] < self.bu:
+                st[1] += 1
+                return True
+            st[2] += 1
+            return False
+
+    def flush(self, force=False):
+        """Return summary records for dropped counts and clear them.
+
+        Only windows that have ended are flushed unless `force` is set.
+        """
+        n = time.monotonic()
+        out = []
+        with self.lk:
+            for k, st in list(self.s.items()):
+                ended = n - st[0] >= self.w
+                if st[2] and (ended or force):
+                    nm, lv, pn, ln = k
+                    out.append(logging.makeLogRecord({
+                        "name": nm,
+                        "levelno": lv,
+                        "levelname": logging.getLevelName(lv),
+                        "pathname": pn,
+                        "lineno": ln,
+                        "msg": "Suppressed %s repeated record(s) like %r from %s:%s.",
+                        "args": (st[2], st[3], pn, ln),
+                        "suppressed": st[2],
+                    }))
+                    st[2] = 0
+                if ended:
+                    del self.s[k]
+        return out
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # The stock prepare() formats the message on the caller's thread; the
+    # listener lives in this process, so hand the record over untouched and
+    # let the background thread do all formatting.
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(level=logging.INFO, fmt="json", window=60.0, burst=5):
+    """Route all logging through a queue drained by one background thread.
+
+    Installed on the root logger so the bot, discord.py and the keep-alive
+    Flask server share a single pipeline. Safe to call more than once.
+    A `window` of 0 or less disables error sampling.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    sh = logging.StreamHandler()
+    if fmt == "json":
+        sh.setFormatter(JsonFormatter())
+    else:
+        sh.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
+
+    q = queue.SimpleQueue()
+    qh = _QueueHandler(q)
+    # window <= 0 turns sampling off
+    es = ErrorSampler(window=window, burst=burst) if window > 0 else None
+    if es:
+        qh.addFilter(es)
+
+    r = logging.getLogger()
+    for h in list(r.handlers):
+        r.removeHandler(h)
+    r.addHandler(qh)
+    r.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(q, sh, respect_handler_level=True)
+    _listener.start()
+
+    # Report drop counts once their window ends, without waiting for the
+    # call site to log again; flush whatever is left on shutdown.
+    sd = threading.Event()
+
+    def fl():
+        while not sd.wait(window):
+            for rec in es.flush():
+                q.put_nowait(rec)
+
+    if es:
+        threading.Thread(target=fl, name="log-sampler", daemon=True).start()
+
+    def stop():
+        sd.set()
+        if es:
+            for rec in es.flush(force=True):
+                q.put_nowait(rec)
+        _listener.stop()
+
+    atexit.register(stop)
+    return _listener
@@ -5,20 +5,26 @@ import os
 import json
 import logging
 import asyncio
+import threading
 from dotenv import load_dotenv
 from openai import OpenAI
 from keep_alive import keep_alive
+from log_pipeline import setup_logging
+from shapes_breaker import ShapesBreaker
 
 # Load environment variables
 load_dotenv()
 t = os.getenv("DISCORD_TOKEN")
 a = os.getenv("SHAPESINC_API_KEY")
 u = os.getenv("SHAPESINC_MODEL_USERNAME")
-
-# Logging config
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s:%(levelname)s:%(name)s: %(message)s'
+hb = os.getenv("SHAPESINC_HEDGE_BUDGET")
+
+# Logging config: queue-backed pipeline shared with the keep-alive thread
+setup_logging(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    fmt=os.getenv("LOG_FORMAT", "json"),
+    window=float(os.getenv("LOG_SAMPLE_WINDOW", 60)),
+    burst=int(os.getenv("LOG_SAMPLE_BURST", 5)),
 )
 l = logging.getLogger('YuZhongBot')
 
@@ -28,6 +34,17 @@ mt = 5000
 m = "user_memories"
 ecf = "enabled_channels.json"
 
+# Memory retention policy (0 disables a limit, or the job for the interval)
+mttl = float(os.getenv("MEMORY_IDLE_TTL_DAYS", 30))
+mca = float(os.getenv("MEMORY_COMPACT_AFTER_DAYS", 7))
+mck = int(os.getenv("MEMORY_COMPACT_KEEP_MESSAGES", 10))
+mgq = int(float(os.getenv("MEMORY_GUILD_QUOTA_MB", 50)) * 1048576)
+mtq = int(float(os.getenv("MEMORY_GLOBAL_QUOTA_MB", 500)) * 1048576)
+mri = float(os.getenv("MEMORY_RETENTION_INTERVAL_MINUTES", 60))
+
+# Time /search waits for patch context before answering without it
+scb = float(os.getenv("SEARCH_CONTEXT_BUDGET", 3))
+
 # Ensure memory dir exists
 os.makedirs(m, exist_ok=True)
 
@@ -50,7 +67,7 @@ def l_e_c():
             with open(ecf, "r", encoding="utf-8") as f:
                 return json.load(f)
         except json.JSONDecodeError as e:
-            l.error(f"Error decoding {ecf}: {e}")
+            l.error("Error decoding %s: %s", ecf, e)
             return {}
     return {}
 
@@ -59,10 +76,16 @@ def s_e_c(a_d):
         with open(ecf, "w", encoding="utf-8") as f:
             json.dump(a_d, f, indent=4)
     except IOError as e:
-        l.error(f"Failed to save enabled channels: {e}")
+        l.error("Failed to save enabled channels: %s", e)
 
 ac = l_e_c()
 
+# Striped per-file locks shared by every reader/writer of memory files
+mls = [threading.RLock() for _ in range(64)]
+
+def m_l(fp):
+    return mls[hash(os.path.normpath(fp)) % len(mls)]
+
 # Bot setup
 i = discord.Intents.default()
 i.message_content = True
@@ -78,13 +101,31 @@ b.SHAPESINC_MODEL_USERNAME = u
 b.active_channels = ac
 b.save_enabled_channels = lambda: s_e_c(b.active_channels)
 b.MEMORY_DIR = m
+b.memory_lock = m_l
 b.personality = p
 b.DEFAULT_TONE = dt
 b.MAX_MEMORY_PER_USER_TOKENS = mt
+b.MEMORY_IDLE_TTL_DAYS = mttl
+b.MEMORY_COMPACT_AFTER_DAYS = mca
+b.MEMORY_COMPACT_KEEP_MESSAGES = mck
+b.MEMORY_GUILD_QUOTA_BYTES = mgq
+b.MEMORY_GLOBAL_QUOTA_BYTES = mtq
+b.MEMORY_RETENTION_INTERVAL_MINUTES = mri
+b.SEARCH_CONTEXT_BUDGET = scb
 
 b.shapes_client = None
 b.SHAPESINC_SHAPE_MODEL = None
 
+# Circuit breaker + bounded pool shared by every Shapes.inc call
+b.shapes_breaker = ShapesBreaker(
+    max_workers=int(os.getenv("SHAPESINC_MAX_WORKERS", 4)),
+    failure_threshold=int(os.getenv("SHAPESINC_FAILURE_THRESHOLD", 5)),
+    reset_timeout=float(os.getenv("SHAPESINC_RESET_TIMEOUT", 30)),
+    call_timeout=float(os.getenv("SHAPESINC_CALL_TIMEOUT", 30)),
+    queue_timeout=float(os.getenv("SHAPESINC_QUEUE_TIMEOUT", 30)),
+    hedge_budget=float(hb) if hb else None,
+)
+
 # Utility: Send response safely
 async def s_s_r(i, mes, e = False):
     try:
@@ -93,45 +134,46 @@ async def s_s_r(i, mes, e = False):
         else:
             await i.response.send_message(mes, ephemeral=e)
     except Exception as e:
-        l.error(f"Failed to send response for interaction {i.id}: {e}")
+        l.error("Failed to send response for interaction %s: %s", i.id, e)
         try:
             await i.followup.send(f"An error occurred: {e}", ephemeral=True)
         except Exception as e2:
-            l.error(f"Both response methods failed: {e2}")
+            l.error("Both response methods failed: %s", e2)
 
 b.safe_send_response = s_s_r
 
 # Events
 @b.event
 async def on_ready():
-    l.info(f'Logged in as {b.user.name} ({b.user.id})')
+    l.info('Logged in as %s (%s)', b.user.name, b.user.id)
 
     # Load cogs
     ie = [
         "cogs.admin",
         "cogs.mlbb",
         "cogs.ai_chat",
+        "cogs.memory",
     ]
     for ext in ie:
         try:
             await b.load_extension(ext)
-            l.info(f"Loaded extension: {ext}")
+            l.info("Loaded extension: %s", ext)
         except commands.ExtensionError as e:
-            l.error(f"Failed to load extension {ext}: {e}")
+            l.error("Failed to load extension %s: %s", ext, e)
 
     try:
         synced = await b.tree.sync()
-        l.info(f"Synced {len(synced)} command(s).")
+        l.info("Synced %s command(s).", len(synced))
     except Exception as e:
-        l.error(f"Failed to sync commands: {e}")
+        l.error("Failed to sync commands: %s", e)
 
 @b.event
 async def on_member_join(mem):
-    l.info(f'{mem.name} has joined the server!')
+    l.info('%s has joined the server!', mem.name)
 
 @b.event
 async def on_guild_join(g):
-    l.info(f"Joined new guild: {g.name} ({g.id})")
+    l.info("Joined new guild: %s (%s)", g.name, g.id)
     dc = g.system_channel or (g.text_channels[0] if g.text_channels else None)
     if dc:
         try:
@@ -139,7 +181,7 @@ async def on_guild_join(g):
                 f"Behold, I, Yu Zhong, have arrived! To activate my power in a channel, an administrator must use `/arise`."
             )
         except discord.Forbidden:
-            l.warning(f"Missing permissions to send welcome message in {g.name}.")
+            l.warning("Missing permissions to send welcome message in %s.", g.name)
 
 @b.event
 async def on_message(mes):
@@ -167,9 +209,9 @@ async def main():
     try:
         await b.start(t)
     except discord.errors.LoginFailure as e:
-        l.critical(f"Failed to log in: {e}")
+        l.critical("Failed to log in: %s", e)
     except Exception as e:
-        l.critical(f"Unexpected startup error: {e}")
+        l.critical("Unexpected startup error: %s", e)
 
 if __name__ == "__main__":
     try:
@@ -177,5 +219,6 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         l.info("Bot shutting down...")
         asyncio.run(b.close())
+        b.shapes_breaker.shutdown()
     except Exception as e:
-        l.error(f"Unhandled error: {e}")
+        l.error("Unhandled error: %s", e)
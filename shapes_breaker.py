@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from openai import APIConnectionError
+except ImportError:
+    APIConnectionError = ()
+
+logger = logging.getLogger('YuZhongBot')
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when the Shapes.inc circuit is open and the call is refused."""
+
+
+class PoolSaturatedError(CircuitOpenError):
+    """Raised when no pool worker frees up in time; not an upstream failure."""
+
+
+class ShapesBreaker:
+    """Guards blocking Shapes.inc client calls.
+
+    Calls run on a dedicated bounded thread pool so a degraded API cannot
+    starve the default executor used by scraping and other to_thread work.
+    After `failure_threshold` consecutive failures or timeouts the circuit
+    opens and calls fail fast with CircuitOpenError. Once `reset_timeout`
+    seconds pass a single half-open probe is let through; its outcome
+    closes or re-opens the circuit.
+
+    `call_timeout` only runs once a worker picks the call up. Waiting for a
+    free worker is bounded by `queue_timeout` and raises PoolSaturatedError
+    without counting against the circuit. Only timeouts, connection errors,
+    429 and 5xx responses count as failures; other API errors mean the
+    service answered.
+    """
+
+    def __init__(
+        self,
+        max_workers=4,
+        failure_threshold=5,
+        reset_timeout=30.0,
+        call_timeout=30.0,
+        queue_timeout=None,
+        hedge_budget=None,
+        latency_window=50,
+    ):
+        self.ex = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shapes")
+        # Tracks free workers so pool wait is kept out of the call deadline
+        self.sem = asyncio.Semaphore(max_workers)
+        self.ft = failure_threshold
+        self.rt = reset_timeout
+        self.ct = call_timeout
+        self.qt = call_timeout if queue_timeout is None else queue_timeout
+        self.hb = hedge_budget
+
+        self.st = CLOSED
+        self.f = 0
+        self.oa = 0.0
+        self.pr = False
+        self.lat = deque(maxlen=latency_window)
+        self.lk = threading.Lock()
+
+    @property
+    def state(self):
+        return self.st
+
+    def p95(self):
+        with self.lk:
+            s = sorted(self.lat)
+        if len(s) < 10:
+            return None
+        return s[min(len(s) - 1, int(len(s) * 0.95))]
+
+    def _acquire(self):
+        """Return True if this call is the half-open probe, raise if refused."""
+        with self.lk:
+            if self.st == CLOSED:
+                return False
+            if self.st == OPEN and time.monotonic() - self.oa >= self.rt:
+                self.st = HALF_OPEN
+                self.pr = False
+                logger.info("Shapes.inc circuit half-open; sending probe.")
+            if self.st == HALF_OPEN and not self.pr:
+                self.pr = True
+                return True
+            raise CircuitOpenError("Shapes.inc circuit is open.")
+
+    def _is_failure(self, e):
+        if isinstance(e, (asyncio.TimeoutError, ConnectionError)):
+            return True
+        if APIConnectionError and isinstance(e, APIConnectionError):
+            return True
+        sc = getattr(e, "status_code", None)
+        return sc is not None and (sc == 429 or sc >= 500)
+
+    def _record_success(self, el=None):
+        with self.lk:
+            if el is not None:
+                self.lat.append(el)
+            self.f = 0
+            if self.st != CLOSED:
+                logger.info("Shapes.inc circuit closed; service recovered.")
+            self.st = CLOSED
+            self.pr = False
+
+    def _record_failure(self, probe):
+        with self.lk:
+            self.f += 1
+            if probe or self.st == HALF_OPEN or self.f >= self.ft:
+                if self.st != OPEN:
+                    logger.warning("Shapes.inc circuit opened after %s consecutive failure(s).", self.f)
+                self.st = OPEN
+                self.oa = time.monotonic()
+                self.pr = False
+
+    def _release_probe(self):
+        # A probe that ended without a result (e.g. cancelled) proves nothing;
+        # reopen so the next reset_timeout lets a fresh probe through.
+        with self.lk:
+            if self.st == HALF_OPEN:
+                self.st = OPEN
+                self.oa = time.monotonic()
+            self.pr = False
+
+    async def _submit(self, lp, job):
+        """Wait for a free worker, then start `job` on it.
+
+        The slot is released when the thread actually finishes, not when the
+        caller stops waiting, so abandoned calls still count against the pool.
+        """
+        try:
+            await asyncio.wait_for(self.sem.acquire(), timeout=self.qt)
+        except asyncio.TimeoutError:
+            raise PoolSaturatedError("No Shapes.inc worker free.") from None
+
+        def rel(_):
+            try:
+                lp.call_soon_threadsafe(self.sem.release)
+            except RuntimeError:
+                # Loop already closed during shutdown
+                pass
+
+        cf = self.ex.submit(job)
+        cf.add_done_callback(rel)
+        return asyncio.wrap_future(cf, loop=lp)
+
+    async def call(self, fn, *args, hedge=False, **kwargs):
+        """Run a blocking client call on the bounded pool under the breaker.
+
+        With `hedge=True` and a configured budget, a second identical request
+        is fired if the first has not answered within the budget while the
+        observed p95 latency is over it and a worker is free; the first reply
+        to arrive wins.
+        """
+        probe = self._acquire()
+        lp = asyncio.get_running_loop()
+
+        def job():
+            return fn(*args, **kwargs)
+
+        try:
+            hd = self.hb if hedge and not probe and self.hb else None
+            if hd is not None:
+                p = self.p95()
+                if p is None or p <= hd:
+                    hd = None
+
+            fut = await self._submit(lp, job)
+            st = time.monotonic()
+            if hd is None:
+                res = await asyncio.wait_for(fut, timeout=self.ct)
+            else:
+                res = await self._hedged(lp, job, fut, hd)
+        except CircuitOpenError:
+            if probe:
+                self._release_probe()
+            raise
+        except Exception as e:
+            if self._is_failure(e):
+                self._record_failure(probe)
+            else:
+                self._record_success()
+            raise
+        except BaseException:
+            if probe:
+                self._release_probe()
+            raise
+
+        self._record_success(time.monotonic() - st)
+        return res
+
+    async def _hedged(self, lp, job, fut, hd):
+        fs = [fut]
+        dl = time.monotonic() + self.ct
+        dn, _ = await asyncio.wait(fs, timeout=hd)
+        if not dn and not self.sem.locked():
+            logger.info("Shapes.inc call exceeded %.1fs hedge budget; sending hedged request.", hd)
+            fs.append(await self._submit(lp, job))
+
+        while fs:
+            rem = dl - time.monotonic()
+            if rem <= 0:
+                break
+            dn, _ = await asyncio.wait(fs, timeout=rem, return_when=asyncio.FIRST_COMPLETED)
+            if not dn:
+                break
+            for d in dn:
+                fs.remove(d)
+                if d.exception() is None:
+                    for o in fs:
+                        o.cancel()
+                    return d.result()
+                if not fs:
+                    raise d.exception()
+
+        for o in fs:
+            o.cancel()
+        raise asyncio.TimeoutError("Shapes.inc call timed out.")
+
+    def shutdown(self):
+        self.ex.shutdown(wait=False, cancel_futures=True)